@@ -5,9 +5,10 @@ Generates improved prompt variants and evaluates them
 
 import gradio as gr
 import os
+from collections import OrderedDict
 from dotenv import load_dotenv
 from prompt_optimizer import PromptOptimizer
-from evaluator import PromptEvaluator
+from evaluator import PromptEvaluator, DEFAULT_TEMPERATURE, EVAL_MODE_TEMPERATURE
 
 # Load environment variables
 load_dotenv()
@@ -21,30 +22,93 @@ if not api_key:
 
 evaluator = PromptEvaluator(api_key)
 
-def optimize_and_evaluate(original_prompt: str, test_prompts: bool = True):
+# Markdown block for one evaluated variant, filled with str.format_map
+_RESULT_TEMPLATE = """### {medal} {name}
+**Overall Score: {overall}/10**
+
+**Scores:**
+{scores_md}
+
+**Metrics:**
+- Tokens: {total_tokens}
+- Cost: ${cost_usd:.6f}
+- Time: {execution_time}s
+
+**Sample Response Preview:**
+```
+{preview}
+```
+
+---
+
+"""
+
+# Rendered outputs of recent runs, so clicking again with unchanged inputs
+# returns instantly without regenerating or re-evaluating anything
+_RESULTS_CACHE_SIZE = 32
+_results_cache = OrderedDict()
+
+async def optimize_and_evaluate(original_prompt: str, test_prompts: bool = True, use_batch_api: bool = False,
+                                eval_mode: bool = False):
     """
     Main function that generates variants and optionally tests them
     """
     if not original_prompt or len(original_prompt.strip()) < 10:
         return "❌ Please enter a prompt with at least 10 characters.", "", ""
     
+    key = (original_prompt.strip(), test_prompts, use_batch_api, eval_mode)
+    if key in _results_cache:
+        _results_cache.move_to_end(key)
+        return _results_cache[key]
+    
+    outputs, all_succeeded = await _compute(*key)
+    
+    # Don't pin failed evaluations - retrying should call the API again
+    if all_succeeded:
+        _results_cache[key] = outputs
+        if len(_results_cache) > _RESULTS_CACHE_SIZE:
+            _results_cache.popitem(last=False)
+    
+    return outputs
+
+def clear_cache():
+    """
+    Forget memoized runs and cached API responses, for intentional re-runs
+    """
+    _results_cache.clear()
+    evaluator.cache.clear()
+
+async def _compute(original_prompt: str, test_prompts: bool, use_batch_api: bool, eval_mode: bool):
+    """
+    Generate and evaluate variants for a validated prompt
+    
+    Returns the three markdown outputs and whether every evaluation succeeded.
+    """
     # Generate variants
     variants = optimizer.generate_variants(original_prompt)
     
     # Format variants for display
-    variants_output = "## 📝 Generated Prompt Variants\n\n"
+    variant_parts = ["## 📝 Generated Prompt Variants\n\n"]
     for i, (technique, data) in enumerate(variants.items(), 1):
-        variants_output += f"### {i}. {data['technique']}\n"
-        variants_output += f"*{data['description']}*\n\n"
-        variants_output += f"```\n{data['prompt']}\n```\n\n"
-        variants_output += "---\n\n"
+        variant_parts.append(f"### {i}. {data['technique']}\n")
+        variant_parts.append(f"*{data['description']}*\n\n")
+        variant_parts.append(f"```\n{data['prompt']}\n```\n\n")
+        variant_parts.append("---\n\n")
+    variants_output = "".join(variant_parts)
     
     # If user wants to test prompts
     if test_prompts:
-        results_output = "## 🎯 Evaluation Results\n\n"
-        results_output += "*Testing all variants with GPT-4o-mini...*\n\n"
+        result_parts = ["## 🎯 Evaluation Results\n\n"]
+        if use_batch_api:
+            result_parts.append("*Tested all variants with GPT-4o-mini via the Batch API (50% cheaper)*\n\n")
+        else:
+            result_parts.append("*Testing all variants with GPT-4o-mini...*\n\n")
         
-        eval_results = evaluator.evaluate_all_variants(variants)
+        eval_results = await evaluator.aevaluate_all_variants(
+            variants,
+            use_batch_api=use_batch_api,
+            temperature=EVAL_MODE_TEMPERATURE if eval_mode else DEFAULT_TEMPERATURE
+        )
         
         # Sort by score
         sorted_results = sorted(
@@ -57,25 +121,23 @@ def optimize_and_evaluate(original_prompt: str, test_prompts: bool = True):
         for rank, (technique, result) in enumerate(sorted_results, 1):
             if result["success"]:
                 medal = "🥇" if rank == 1 else "🥈" if rank == 2 else "🥉" if rank == 3 else f"{rank}."
-                results_output += f"### {medal} {variants[technique]['technique']}\n"
-                results_output += f"**Overall Score: {result['overall_score']}/10**\n\n"
-                
                 # Scores breakdown
-                results_output += "**Scores:**\n"
-                for metric, score in result["scores"].items():
-                    results_output += f"- {metric.title()}: {score:.1f}/10\n"
-                
-                # Metrics
-                results_output += f"\n**Metrics:**\n"
-                results_output += f"- Tokens: {result['metrics']['total_tokens']}\n"
-                results_output += f"- Cost: ${result['metrics']['cost_usd']:.6f}\n"
-                results_output += f"- Time: {result['metrics']['execution_time']}s\n"
-                
+                scores_md = "\n".join(f"- {metric.title()}: {score:.1f}/10" for metric, score in result["scores"].items())
                 # Sample response
-                results_output += f"\n**Sample Response Preview:**\n"
                 preview = result["response"][:200] + "..." if len(result["response"]) > 200 else result["response"]
-                results_output += f"```\n{preview}\n```\n\n"
-                results_output += "---\n\n"
+                
+                result_parts.append(_RESULT_TEMPLATE.format_map({
+                    "medal": medal,
+                    "name": variants[technique]["technique"],
+                    "overall": result["overall_score"],
+                    "scores_md": scores_md,
+                    "total_tokens": result["metrics"]["total_tokens"],
+                    "cost_usd": result["metrics"]["cost_usd"],
+                    "execution_time": result["metrics"]["execution_time"],
+                    "preview": preview
+                }))
+        
+        results_output = "".join(result_parts)
         
         # Summary
         summary = f"""## 💰 Cost Summary
@@ -88,10 +150,11 @@ def optimize_and_evaluate(original_prompt: str, test_prompts: bool = True):
 *Note: Scores are heuristic-based. For production, use LLM-as-judge for more accurate evaluation.*
 """
         
-        return variants_output, results_output, summary
+        all_succeeded = all(result["success"] for result in eval_results["results"].values())
+        return (variants_output, results_output, summary), all_succeeded
     
     else:
-        return variants_output, "*(Evaluation skipped - toggle 'Test Prompts' to see results)*", ""
+        return (variants_output, "*(Evaluation skipped - toggle 'Test Prompts' to see results)*", ""), True
 
 
 # Custom CSS for better styling
@@ -139,8 +202,21 @@ with gr.Blocks(css=custom_css, title="Prompt Optimizer") as demo:
                 value=True
             )
             
+            batch_toggle = gr.Checkbox(
+                label="Use Batch API (cheaper, slower)",
+                value=False
+            )
+            
+            with gr.Accordion("Advanced settings", open=False):
+                eval_mode_toggle = gr.Checkbox(
+                    label="Eval mode: temperature 0 (repeatable results, cached for 24h)",
+                    value=False
+                )
+            
             optimize_btn = gr.Button("🎯 Generate & Evaluate", variant="primary", size="lg")
             
+            clear_cache_btn = gr.Button("🧹 Clear cache", variant="secondary", size="sm")
+            
             gr.Markdown("""
             ### 💡 Tips:
             - Start with a simple, basic prompt
@@ -160,10 +236,12 @@ with gr.Blocks(css=custom_css, title="Prompt Optimizer") as demo:
     # Event handler
     optimize_btn.click(
         fn=optimize_and_evaluate,
-        inputs=[original_prompt, test_toggle],
+        inputs=[original_prompt, test_toggle, batch_toggle, eval_mode_toggle],
         outputs=[variants_display, results_display, summary_display]
     )
     
+    clear_cache_btn.click(fn=clear_cache, inputs=None, outputs=None)
+    
     gr.Markdown("""
     ---
     
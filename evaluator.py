@@ -2,114 +2,651 @@
 Evaluator - Tests prompt variants and scores them on multiple dimensions
 """
 
-from openai import OpenAI
+from openai import OpenAI, AsyncOpenAI
+from aiolimiter import AsyncLimiter
+from diskcache import Cache, Disk, UNKNOWN
+import asyncio
+import hashlib
+import httpx
+import orjson
+import re
+import threading
 import time
 
+# Optional JIT-compiled clarity scan for bulk scoring (e.g. prompt sweeps)
+try:
+    import numba
+    import numpy as np
+    _NUMBA_AVAILABLE = True
+except ImportError:
+    _NUMBA_AVAILABLE = False
+
+MODEL = "gpt-4o-mini"  # Using mini for cost efficiency
+DEFAULT_TEMPERATURE = 0.7
+# Temperature 0 makes responses (near) deterministic, so cache hits are correct
+EVAL_MODE_TEMPERATURE = 0.0
+
+# Output token caps sized to what each technique needs - output tokens are
+# the expensive ones, and the cap bounds latency too
+DEFAULT_MAX_TOKENS = 400
+MAX_TOKENS_BY_TECHNIQUE = {
+    "concise": 150,
+    "structured_output": 600
+}
+
+# Structure indicators used for the clarity score, matched in a single pass -
+# case folding is ASCII-only so "ſecond" or "fİrst" don't count, just as in
+# the byte-level numba sweep below
+_CLARITY_RE = re.compile(r"first|second|example|:|-|1\.|2\.", re.IGNORECASE | re.ASCII)
+
+if _NUMBA_AVAILABLE:
+    _FIRST = np.frombuffer(b"first", dtype=np.uint8)
+    _SECOND = np.frombuffer(b"second", dtype=np.uint8)
+    _EXAMPLE = np.frombuffer(b"example", dtype=np.uint8)
+
+    @numba.njit(cache=True)
+    def _starts_with(buf, i, word):
+        if i + len(word) > len(buf):
+            return False
+        for j in range(len(word)):
+            if buf[i + j] != word[j]:
+                return False
+        return True
+
+    @numba.njit(cache=True)
+    def _clarity_count_numba(response_bytes):
+        """
+        Count _CLARITY_RE matches in a lowercased UTF-8 response with a
+        single byte-level sweep (same leftmost, non-overlapping semantics)
+        """
+        count = 0
+        i = 0
+        n = len(response_bytes)
+        while i < n:
+            c = response_bytes[i]
+            if c == 58 or c == 45:  # ":" or "-"
+                count += 1
+                i += 1
+            elif (c == 49 or c == 50) and i + 1 < n and response_bytes[i + 1] == 46:  # "1." or "2."
+                count += 1
+                i += 2
+            elif c == 102 and _starts_with(response_bytes, i, _FIRST):
+                count += 1
+                i += 5
+            elif c == 115 and _starts_with(response_bytes, i, _SECOND):
+                count += 1
+                i += 6
+            elif c == 101 and _starts_with(response_bytes, i, _EXAMPLE):
+                count += 1
+                i += 7
+            else:
+                i += 1
+        return count
+
+# Responses are streamed and cut off past this many words - anything longer
+# no longer improves the scores, but its output tokens are still billed
+MAX_RESPONSE_WORDS = 350
+
+# Connection pool for concurrent requests - keep-alive lets all variants
+# reuse TCP+TLS connections instead of paying a handshake per request
+HTTP_LIMITS = httpx.Limits(max_connections=8, max_keepalive_connections=8)
+HTTP_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+
+# Default OpenAI rate limits for gpt-4o-mini (tier 1), per minute
+DEFAULT_RPM_LIMIT = 500
+DEFAULT_TPM_LIMIT = 200000
+
+CACHE_DIR = ".promptcache"
+CACHE_TTL = 86400  # seconds
+
+# Batch API requests are billed at half the real-time price
+BATCH_DISCOUNT = 0.5
+BATCH_POLL_INTERVAL = 5  # seconds
+BATCH_TERMINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
+# Process-wide OpenAI clients and rate limiters, shared by every
+# PromptEvaluator so extra evaluators neither multiply connection pools nor
+# each get their own copy of the account's rate limits
+_CLIENT: OpenAI | None = None
+# Pooled async clients per event loop, keyed by API key
+_ASYNC_CLIENTS: dict = {}
+# Rate limiter state per event loop, keyed by (rpm_limit, tpm_limit) - like
+# connection pools, limiters are bound to the loop they first run in.
+# Both are dropped for a loop by PromptEvaluator.aclose
+_LIMITERS: dict = {}
+# The sync wrappers may run event loops on several threads at once
+_STATE_LOCK = threading.Lock()
+
+def _get_client(api_key: str) -> OpenAI:
+    """
+    Shared sync OpenAI client, created on first use
+    """
+    global _CLIENT
+    if _CLIENT is None or _CLIENT.api_key != api_key:
+        _CLIENT = OpenAI(api_key=api_key)
+    return _CLIENT
+
+def _get_async_client(api_key: str) -> AsyncOpenAI:
+    """
+    Shared pooled AsyncOpenAI client for the running event loop
+    
+    httpx connection pools are bound to the event loop they were created
+    in, so each loop (e.g. each asyncio.run call) gets its own client, built
+    inside the loop that uses it and closed by PromptEvaluator.aclose.
+    """
+    loop = asyncio.get_running_loop()
+    with _STATE_LOCK:
+        per_loop = _ASYNC_CLIENTS.setdefault(loop, {})
+        client = per_loop.get(api_key)
+        if client is None:
+            # The SDK retries 429s and timeouts with exponential backoff
+            # (max_retries=2 -> 3 attempts)
+            client = per_loop[api_key] = AsyncOpenAI(
+                api_key=api_key,
+                max_retries=2,
+                http_client=httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+            )
+    return client
+
+class _RateLimits:
+    """
+    Request and token limiters for one event loop, plus their token debt
+    """
+    def __init__(self, rpm_limit: int, tpm_limit: int):
+        self.requests = AsyncLimiter(max_rate=rpm_limit, time_period=60)
+        self.tokens = AsyncLimiter(max_rate=tpm_limit, time_period=60)
+        # Tokens used beyond their reservation, charged to the next reservation
+        self.token_debt = 0
+
+def _get_limiters(rpm_limit: int, tpm_limit: int) -> _RateLimits:
+    """
+    Rate limiters shared by every evaluator on the running event loop
+    
+    Each asyncio.run call gets its own limiters, dropped by
+    PromptEvaluator.aclose once the call is done.
+    """
+    loop = asyncio.get_running_loop()
+    with _STATE_LOCK:
+        per_loop = _LIMITERS.setdefault(loop, {})
+        limits = per_loop.get((rpm_limit, tpm_limit))
+        if limits is None:
+            limits = per_loop[(rpm_limit, tpm_limit)] = _RateLimits(rpm_limit, tpm_limit)
+    return limits
+
+class _OrjsonDisk(Disk):
+    """
+    diskcache serializer storing values as orjson bytes instead of pickles
+    """
+    def store(self, value, read, key=UNKNOWN):
+        if not read:
+            value = orjson.dumps(value)
+        return super().store(value, read, key=key)
+    
+    def fetch(self, mode, filename, value, read):
+        data = super().fetch(mode, filename, value, read)
+        if not read:
+            data = orjson.loads(data)
+        return data
+
 class PromptEvaluator:
-    def __init__(self, api_key: str):
-        self.client = OpenAI(api_key=api_key)
-        self.test_question = "Explain the concept of machine learning to a beginner."
+    def __init__(self, api_key: str, cache_dir: str = CACHE_DIR,
+                 rpm_limit: int = DEFAULT_RPM_LIMIT, tpm_limit: int = DEFAULT_TPM_LIMIT):
+        self.api_key = api_key
+        self.client = _get_client(api_key)
+        # Responses keyed by request parameters, shared across runs and restarts
+        self.cache = Cache(cache_dir, disk=_OrjsonDisk)
+        # Throttle requests and tokens to stay under the account's rate limits
+        self.rpm_limit = rpm_limit
+        self.tpm_limit = tpm_limit
         
-    def evaluate_prompt(self, prompt_text: str, technique_name: str) -> dict:
+    def evaluate_prompt(self, prompt_text: str, technique_name: str,
+                        temperature: float = DEFAULT_TEMPERATURE,
+                        max_tokens: int = DEFAULT_MAX_TOKENS) -> dict:
         """
         Test a prompt variant and return scores + metrics
         """
-        start_time = time.time()
+        return asyncio.run(self._arun_and_close(
+            self._aevaluate_prompt(prompt_text, technique_name, temperature, max_tokens)
+        ))
+    
+    async def _arun_and_close(self, coro):
+        """
+        Await coro, then close the pooled client bound to this event loop
         
+        The sync wrappers start a fresh loop per call (asyncio.run), and a
+        pool can't outlive its loop - close it rather than leak it.
+        """
         try:
-            # Get response from the prompt
-            response = self.client.chat.completions.create(
-                model="gpt-4o-mini",  # Using mini for cost efficiency
-                messages=[
-                    {"role": "user", "content": prompt_text}
-                ],
-                max_tokens=500,
-                temperature=0.7
-            )
-            
-            execution_time = time.time() - start_time
-            response_text = response.choices[0].message.content
+            return await coro
+        finally:
+            await self.aclose()
+    
+    async def aclose(self):
+        """
+        Close the shared pooled async clients that belong to the running loop
+        
+        The loop's rate limiters are dropped too. Any evaluator that makes
+        another request afterwards gets a new client and fresh limiters.
+        """
+        loop = asyncio.get_running_loop()
+        with _STATE_LOCK:
+            clients = _ASYNC_CLIENTS.pop(loop, {})
+            _LIMITERS.pop(loop, None)
+        for client in clients.values():
+            await client.close()
+    
+    def _request_body(self, prompt_text: str, temperature: float = DEFAULT_TEMPERATURE,
+                      max_tokens: int = DEFAULT_MAX_TOKENS) -> dict:
+        """
+        Chat completion parameters shared by the real-time and batch paths
+        """
+        return {
+            "model": MODEL,
+            "messages": [
+                {"role": "user", "content": prompt_text}
+            ],
+            "max_tokens": max_tokens,
+            "temperature": temperature
+        }
+    
+    def _prompt_cache_key(self, technique_name: str) -> str:
+        """
+        OpenAI prompt cache namespace - variants of one technique share a prefix
+        """
+        return f"optimizer:{technique_name}"
+    
+    def _cache_key(self, body: dict) -> str:
+        """
+        Hash of everything that determines the response for a request
+        """
+        raw = f"{body['model']}|{body['temperature']}|{body['max_tokens']}|{body['messages'][0]['content']}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+    
+    def _cache_response(self, key: str, response_text: str, input_tokens: int,
+                        output_tokens: int, truncated: bool = False):
+        """
+        Store the raw API output for a request - scores are recomputed on every hit
+        """
+        self.cache.set(key, {
+            "response": response_text,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "truncated": truncated
+        }, expire=CACHE_TTL)
+    
+    def _cached_result(self, key: str, prompt_text: str, technique_name: str):
+        """
+        Score the cached response for key, or return None on a cache miss
+        """
+        cached = self.cache.get(key)
+        if cached is None:
+            return None
+        
+        # A cache hit is free and instant
+        result = self._build_result(
+            cached["response"],
+            prompt_text,
+            technique_name,
+            cached["input_tokens"],
+            cached["output_tokens"],
+            0.0,
+            price_multiplier=0.0
+        )
+        result["metrics"].update(truncated=cached["truncated"], cached=True)
+        return result
+    
+    async def _aevaluate_prompt(self, prompt_text: str, technique_name: str,
+                                temperature: float = DEFAULT_TEMPERATURE,
+                                max_tokens: int = DEFAULT_MAX_TOKENS) -> dict:
+        """
+        Async version of evaluate_prompt, used to evaluate variants concurrently
+        """
+        body = self._request_body(prompt_text, temperature, max_tokens)
+        key = self._cache_key(body)
+        cached = await asyncio.to_thread(self._cached_result, key, prompt_text, technique_name)
+        if cached is not None:
+            return cached
+        
+        try:
+            limits = _get_limiters(self.rpm_limit, self.tpm_limit)
             
-            # Calculate costs (approximate for gpt-4o-mini)
-            input_tokens = response.usage.prompt_tokens
-            output_tokens = response.usage.completion_tokens
-            cost = (input_tokens * 0.00015 / 1000) + (output_tokens * 0.0006 / 1000)
+            # Reserve the worst-case token usage up front (~4 characters per
+            # token), plus whatever earlier requests used beyond their own
+            estimate = body["max_tokens"] + len(prompt_text) // 4
+            charge = estimate + limits.token_debt
+            reserved = min(charge, self.tpm_limit)
+            limits.token_debt = charge - reserved
+            await limits.tokens.acquire(reserved)
             
-            # Score the response quality
-            scores = self._score_response(response_text, prompt_text)
+            async with limits.requests:
+                start_time = time.time()
+                
+                # Get response from the prompt
+                response_text, input_tokens, output_tokens, truncated = (
+                    await self._astream_response(body, technique_name)
+                )
+                
+                execution_time = time.time() - start_time
             
-            return {
-                "success": True,
-                "response": response_text,
-                "scores": scores,
-                "metrics": {
-                    "execution_time": round(execution_time, 2),
-                    "input_tokens": input_tokens,
-                    "output_tokens": output_tokens,
-                    "total_tokens": input_tokens + output_tokens,
-                    "cost_usd": round(cost, 6),
-                    "technique": technique_name
-                },
-                "overall_score": round(sum(scores.values()) / len(scores), 1)
-            }
+            # Usage beyond the estimate is charged to the next reservation
+            # instead of making this finished request wait
+            overage = input_tokens + output_tokens - estimate
+            if overage > 0:
+                limits.token_debt += overage
             
+            # Scoring is CPU-bound - run it off the event loop so the other
+            # in-flight requests keep streaming
+            result = await asyncio.to_thread(
+                self._build_result,
+                response_text,
+                prompt_text,
+                technique_name,
+                input_tokens,
+                output_tokens,
+                execution_time
+            )
+            result["metrics"]["truncated"] = truncated
+            self._cache_response(key, response_text, input_tokens, output_tokens, truncated)
+            return result
+        
         except Exception as e:
-            return {
-                "success": False,
-                "error": str(e),
-                "scores": {},
-                "metrics": {},
-                "overall_score": 0
-            }
+            return self._failed_result(e)
     
-    def _score_response(self, response: str, prompt: str) -> dict:
+    async def _astream_response(self, body: dict, technique_name: str) -> tuple:
+        """
+        Stream a completion, stopping early once it exceeds MAX_RESPONSE_WORDS
+        
+        Returns (response_text, input_tokens, output_tokens, truncated).
+        """
+        stream = await _get_async_client(self.api_key).chat.completions.create(
+            **body,
+            stream=True,
+            stream_options={"include_usage": True},
+            extra_body={"prompt_cache_key": self._prompt_cache_key(technique_name)}
+        )
+        
+        parts = []
+        word_count = 0
+        in_word = False
+        usage = None
+        truncated = False
+        
+        async for chunk in stream:
+            if chunk.usage is not None:
+                usage = chunk.usage
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                # Running word count - a delta that starts mid-word continues
+                # the previous delta's last word rather than starting a new one
+                word_count += len(delta.split())
+                if in_word and not delta[0].isspace():
+                    word_count -= 1
+                in_word = not delta[-1].isspace()
+                if word_count > MAX_RESPONSE_WORDS:
+                    # Closing the connection stops generation (and billing)
+                    await stream.response.aclose()
+                    truncated = True
+                    break
+        
+        content = "".join(parts)
+        if usage is not None:
+            return content, usage.prompt_tokens, usage.completion_tokens, truncated
+        
+        # The usage chunk only arrives at the end of the stream, so estimate:
+        # one token per content chunk, ~4 characters per prompt token
+        input_tokens = len(body["messages"][0]["content"]) // 4
+        return content, input_tokens, len(parts), truncated
+    
+    def _build_result(self, response_text: str, prompt_text: str, technique_name: str,
+                      input_tokens: int, output_tokens: int, execution_time: float,
+                      price_multiplier: float = 1.0) -> dict:
+        """
+        Score a completed response and package it with its metrics
+        """
+        # Calculate costs (approximate for gpt-4o-mini)
+        cost = (input_tokens * 0.00015 / 1000) + (output_tokens * 0.0006 / 1000)
+        cost *= price_multiplier
+        
+        # Score the response quality
+        scores, overall_score = self._score_response(response_text, prompt_text)
+        
+        return {
+            "success": True,
+            "response": response_text,
+            "scores": scores,
+            "metrics": {
+                "execution_time": round(execution_time, 2),
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+                "cost_usd": round(cost, 6),
+                "technique": technique_name
+            },
+            "overall_score": overall_score
+        }
+    
+    def _failed_result(self, error) -> dict:
+        """
+        Result placeholder for a variant that could not be evaluated
+        """
+        return {
+            "success": False,
+            "error": str(error),
+            "scores": {},
+            "metrics": {},
+            "overall_score": 0
+        }
+    
+    def _score_response(self, response: str, prompt: str) -> tuple:
         """
         Score response on multiple dimensions (0-10 scale)
         This is a simplified heuristic-based scoring. 
         For production, you'd use another LLM to judge quality.
-        """
-        scores = {}
         
+        Returns the scores dict and the overall (mean) score.
+        """
         # Quality score (based on length and structure)
-        word_count = len(response.split())
+        words = response.split()
+        word_count = len(words)
         if 50 <= word_count <= 300:
-            scores["quality"] = 9.0
+            quality = 9.0
         elif word_count < 50:
-            scores["quality"] = 6.0
+            quality = 6.0
         else:
-            scores["quality"] = 7.5
+            quality = 7.5
         
-        # Clarity score (presence of structure indicators)
-        clarity_indicators = ["first", "second", "example", ":", "-", "1.", "2."]
-        clarity_count = sum(1 for indicator in clarity_indicators if indicator.lower() in response.lower())
-        scores["clarity"] = min(10.0, 6.0 + clarity_count * 0.8)
+        # Clarity score (occurrences of structure indicators)
+        if _NUMBA_AVAILABLE:
+            response_bytes = np.frombuffer(response.lower().encode("utf-8"), dtype=np.uint8)
+            clarity_count = min(_clarity_count_numba(response_bytes), 10)
+        else:
+            clarity_count = min(len(_CLARITY_RE.findall(response)), 10)
+        clarity = min(10.0, 6.0 + clarity_count * 0.8)
         
         # Completeness score (response length relative to prompt complexity)
         prompt_length = len(prompt.split())
         completeness_ratio = word_count / max(prompt_length, 10)
-        scores["completeness"] = min(10.0, 5.0 + completeness_ratio * 2)
+        completeness = min(10.0, 5.0 + completeness_ratio * 2)
         
         # Relevance score (simple keyword matching)
         # For a real implementation, use semantic similarity
-        scores["relevance"] = 8.5  # Simplified
+        relevance = 8.5  # Simplified
         
-        return scores
+        scores = {
+            "quality": quality,
+            "clarity": clarity,
+            "completeness": completeness,
+            "relevance": relevance
+        }
+        return scores, round((quality + clarity + completeness + relevance) * 0.25, 1)
     
-    def evaluate_all_variants(self, variants: dict) -> dict:
+    def evaluate_all_variants(self, variants: dict, use_batch_api: bool = False,
+                              temperature: float = DEFAULT_TEMPERATURE) -> dict:
         """
         Evaluate all prompt variants and return comprehensive results
+        
+        With use_batch_api=True the variants are submitted through the OpenAI
+        Batch API instead: half the price, but results can take minutes.
+        """
+        return asyncio.run(self._arun_and_close(
+            self.aevaluate_all_variants(variants, use_batch_api, temperature)
+        ))
+    
+    async def aevaluate_all_variants(self, variants: dict, use_batch_api: bool = False,
+                                     temperature: float = DEFAULT_TEMPERATURE) -> dict:
+        """
+        Async version of evaluate_all_variants, for callers already running
+        in an event loop (e.g. the Gradio app)
+        """
+        if use_batch_api:
+            # Batch submission polls with the sync client - keep it off the event loop
+            results = await asyncio.to_thread(self._evaluate_batch, variants, temperature)
+            return self._summarize(results)
+        return await self._aevaluate_all(variants, temperature)
+    
+    async def _aevaluate_all(self, variants: dict, temperature: float = DEFAULT_TEMPERATURE) -> dict:
         """
+        Evaluate all variants concurrently - total latency is bounded by
+        the slowest variant instead of the sum of all of them
+        """
+        print(f"Evaluating {len(variants)} variants concurrently...")
+        tasks = [
+            self._aevaluate_prompt(
+                variant_data["prompt"],
+                variant_data["technique"],
+                temperature,
+                MAX_TOKENS_BY_TECHNIQUE.get(technique_name, DEFAULT_MAX_TOKENS)
+            )
+            for technique_name, variant_data in variants.items()
+        ]
+        outcomes = await asyncio.gather(*tasks, return_exceptions=True)
+        
         results = {}
-        total_cost = 0
+        for technique_name, result in zip(variants, outcomes):
+            if isinstance(result, BaseException):
+                result = self._failed_result(result)
+            results[technique_name] = result
+        
+        return self._summarize(results)
+    
+    def _evaluate_batch(self, variants: dict, temperature: float = DEFAULT_TEMPERATURE) -> dict:
+        """
+        Submit all variants as a single Batch API job and wait for it to finish
+        """
+        results = {}
+        bodies = {}
         
+        # Only submit the variants that are not already cached
         for technique_name, variant_data in variants.items():
-            print(f"Evaluating {technique_name}...")
-            result = self.evaluate_prompt(
-                variant_data["prompt"], 
-                variant_data["technique"]
+            body = self._request_body(
+                variant_data["prompt"],
+                temperature,
+                MAX_TOKENS_BY_TECHNIQUE.get(technique_name, DEFAULT_MAX_TOKENS)
             )
-            results[technique_name] = result
+            cached = self._cached_result(
+                self._cache_key(body), variant_data["prompt"], variant_data["technique"]
+            )
+            if cached is not None:
+                results[technique_name] = cached
+            else:
+                bodies[technique_name] = body
+        
+        if not bodies:
+            return results
+        
+        start_time = time.time()
+        
+        try:
+            lines = [
+                orjson.dumps({
+                    "custom_id": technique_name,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": {
+                        **body,
+                        "prompt_cache_key": self._prompt_cache_key(variants[technique_name]["technique"])
+                    }
+                })
+                for technique_name, body in bodies.items()
+            ]
+            batch_file = self.client.files.create(
+                file=("variants.jsonl", b"\n".join(lines)),
+                purpose="batch"
+            )
+            batch = self.client.batches.create(
+                input_file_id=batch_file.id,
+                endpoint="/v1/chat/completions",
+                completion_window="24h"
+            )
+            
+            print(f"Submitted batch {batch.id}, waiting for results...")
+            while batch.status not in BATCH_TERMINAL_STATUSES:
+                time.sleep(BATCH_POLL_INTERVAL)
+                batch = self.client.batches.retrieve(batch.id)
             
+            if not batch.output_file_id:
+                raise RuntimeError(f"Batch {batch.id} {batch.status} without output")
+            
+            output = self.client.files.content(batch.output_file_id).content
+        
+        except Exception as e:
+            results.update({technique_name: self._failed_result(e) for technique_name in bodies})
+            return results
+        
+        execution_time = time.time() - start_time
+        
+        for line in output.splitlines():
+            if not line.strip():
+                continue
+            record = orjson.loads(line)
+            technique_name = record["custom_id"]
+            variant_data = variants[technique_name]
+            
+            response = record.get("response") or {}
+            if record.get("error") or response.get("status_code") != 200:
+                error = record.get("error") or response.get("body", {}).get("error")
+                results[technique_name] = self._failed_result(error)
+                continue
+            
+            body = response["body"]
+            response_text = body["choices"][0]["message"]["content"]
+            input_tokens = body["usage"]["prompt_tokens"]
+            output_tokens = body["usage"]["completion_tokens"]
+            results[technique_name] = self._build_result(
+                response_text,
+                variant_data["prompt"],
+                variant_data["technique"],
+                input_tokens,
+                output_tokens,
+                execution_time,
+                price_multiplier=BATCH_DISCOUNT
+            )
+            self._cache_response(
+                self._cache_key(bodies[technique_name]),
+                response_text,
+                input_tokens,
+                output_tokens
+            )
+        
+        # Requests that never made it into the output file (e.g. expired batch)
+        for technique_name in variants:
+            if technique_name not in results:
+                results[technique_name] = self._failed_result(
+                    f"No batch result (batch {batch.status})"
+                )
+        
+        return {technique_name: results[technique_name] for technique_name in variants}
+    
+    def _summarize(self, results: dict) -> dict:
+        """
+        Attach total cost and the best performing variant to the results
+        """
+        total_cost = 0
+        
+        for result in results.values():
             if result["success"]:
                 total_cost += result["metrics"].get("cost_usd", 0)
         
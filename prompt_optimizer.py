@@ -2,32 +2,11 @@
 Prompt Optimizer - Generates improved versions of user prompts using different techniques
 """
 
-class PromptOptimizer:
-    def __init__(self):
-        self.techniques = {
-            "few_shot": self._apply_few_shot,
-            "chain_of_thought": self._apply_chain_of_thought,
-            "structured_output": self._apply_structured_output,
-            "role_based": self._apply_role_based,
-            "concise": self._apply_concise
-        }
-    
-    def generate_variants(self, original_prompt: str) -> dict:
-        """Generate 5 improved prompt variants using different techniques"""
-        variants = {}
-        
-        for technique_name, technique_func in self.techniques.items():
-            variants[technique_name] = {
-                "prompt": technique_func(original_prompt),
-                "technique": technique_name.replace("_", " ").title(),
-                "description": self._get_technique_description(technique_name)
-            }
-        
-        return variants
-    
-    def _apply_few_shot(self, prompt: str) -> str:
-        """Add few-shot examples to the prompt"""
-        return f"""I'll show you some examples first, then you can apply the same pattern.
+# Every template puts its fixed instructions first and the user's prompt last,
+# so the shared leading tokens can be served from the provider's prompt cache.
+
+# Few-shot: add examples to the prompt
+FEW_SHOT_PREFIX = """I'll show you some examples first, then you can apply the same pattern.
 
 Example 1:
 Input: Write a product description
@@ -37,28 +16,27 @@ Example 2:
 Input: Summarize this article
 Output: "This article discusses three key points: 1) Market trends, 2) Consumer behavior, 3) Future predictions..."
 
-Now, here's your task:
-{prompt}
+Please follow the same detailed, structured approach shown in the examples above.
 
-Please follow the same detailed, structured approach shown in the examples above."""
-    
-    def _apply_chain_of_thought(self, prompt: str) -> str:
-        """Add chain-of-thought reasoning"""
-        return f"""{prompt}
+Now, here's your task:
+"""
+FEW_SHOT_SUFFIX = ""
 
-Please think through this step-by-step:
+# Chain-of-thought: add step-by-step reasoning
+CHAIN_OF_THOUGHT_PREFIX = """Please think through the task below step-by-step:
 1. First, analyze what the task is asking for
 2. Then, identify the key components needed
 3. Next, organize your thoughts logically
 4. Finally, provide a comprehensive response
 
-Walk me through your reasoning process before giving the final answer."""
-    
-    def _apply_structured_output(self, prompt: str) -> str:
-        """Request structured, formatted output"""
-        return f"""{prompt}
+Walk me through your reasoning process before giving the final answer.
+
+Task:
+"""
+CHAIN_OF_THOUGHT_SUFFIX = ""
 
-Please provide your response in the following structured format:
+# Structured output: request structured, formatted output
+STRUCTURED_OUTPUT_PREFIX = """Please provide your response to the task below in the following structured format:
 
 **Overview:**
 [Brief summary]
@@ -71,25 +49,59 @@ Please provide your response in the following structured format:
 **Conclusion:**
 [Final thoughts]
 
-Ensure each section is clearly labeled and well-organized."""
-    
-    def _apply_role_based(self, prompt: str) -> str:
-        """Add expert role context"""
-        return f"""You are an expert professional with deep knowledge in this domain. You have years of experience and are known for providing insightful, accurate, and well-reasoned responses.
+Ensure each section is clearly labeled and well-organized.
+
+Task:
+"""
+STRUCTURED_OUTPUT_SUFFIX = ""
 
-Task: {prompt}
+# Role-based: add expert role context
+ROLE_BASED_PREFIX = """You are an expert professional with deep knowledge in this domain. You have years of experience and are known for providing insightful, accurate, and well-reasoned responses.
 
-As an expert, please provide a thorough response that demonstrates:
+As an expert, please provide a thorough response to the task below that demonstrates:
 - Deep understanding of the subject matter
 - Practical, actionable insights
 - Clear explanations that are easy to follow
-- Professional-level detail and accuracy"""
-    
-    def _apply_concise(self, prompt: str) -> str:
-        """Make the prompt more direct and concise"""
-        return f"""{prompt}
+- Professional-level detail and accuracy
+
+Task: """
+ROLE_BASED_SUFFIX = ""
+
+# Concise: make the prompt more direct and concise
+CONCISE_PREFIX = """Be direct and concise. Provide only the most important information without unnecessary elaboration. Focus on clarity and brevity.
 
-Be direct and concise. Provide only the most important information without unnecessary elaboration. Focus on clarity and brevity."""
+Task:
+"""
+CONCISE_SUFFIX = ""
+
+class PromptOptimizer:
+    def __init__(self):
+        # (prefix, suffix) per technique - variants are built by plain concatenation
+        self.templates = {
+            "few_shot": (FEW_SHOT_PREFIX, FEW_SHOT_SUFFIX),
+            "chain_of_thought": (CHAIN_OF_THOUGHT_PREFIX, CHAIN_OF_THOUGHT_SUFFIX),
+            "structured_output": (STRUCTURED_OUTPUT_PREFIX, STRUCTURED_OUTPUT_SUFFIX),
+            "role_based": (ROLE_BASED_PREFIX, ROLE_BASED_SUFFIX),
+            "concise": (CONCISE_PREFIX, CONCISE_SUFFIX)
+        }
+    
+    def generate_variants(self, original_prompt: str) -> dict:
+        """Generate 5 improved prompt variants using different techniques"""
+        variants = {}
+        
+        for technique_name in self.templates:
+            variants[technique_name] = {
+                "prompt": self._apply(technique_name, original_prompt),
+                "technique": technique_name.replace("_", " ").title(),
+                "description": self._get_technique_description(technique_name)
+            }
+        
+        return variants
+    
+    def _apply(self, technique: str, prompt: str) -> str:
+        """Wrap the prompt in the given technique's template"""
+        prefix, suffix = self.templates[technique]
+        return prefix + prompt + suffix
     
     def _get_technique_description(self, technique: str) -> str:
         """Get description of each technique"""
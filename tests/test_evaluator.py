@@ -0,0 +1,32 @@
+import random
+
+import pytest
+
+import evaluator
+
+PARITY_CASES = [
+    "",
+    "First, an example: 1. do this - 2. then that",
+    "SECOND example-example::first",
+    "ſecond fİrst Example ﬁrst",
+    "K 1.2.3 -- 22. firstsecond",
+]
+
+
+def test_clarity_regex_ignores_non_ascii_case_folding():
+    assert evaluator._CLARITY_RE.findall("ſecond fİrst") == []
+    assert len(evaluator._CLARITY_RE.findall("Second FIRST eXample")) == 3
+
+
+def test_clarity_numba_matches_regex():
+    pytest.importorskip("numba")
+    np = pytest.importorskip("numpy")
+    alphabet = list("firstsecondexample:-12. ") + ["ſ", "İ", "ﬁ", "K", "é"]
+    rng = random.Random(0)
+    cases = PARITY_CASES + [
+        "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 60)))
+        for _ in range(2000)
+    ]
+    for text in cases:
+        response_bytes = np.frombuffer(text.lower().encode("utf-8"), dtype=np.uint8)
+        assert evaluator._clarity_count_numba(response_bytes) == len(evaluator._CLARITY_RE.findall(text)), text